@@ -1,51 +1,154 @@
-import argparse
+import atexit
 import datetime
-import json
+import functools
+import hashlib
+import logging
+import mmap
 import os
+import re
+import struct
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional
-from WazeRouteCalculator import WazeRouteCalculator
+
+logger = logging.getLogger(__name__)
+
+class RouteError(Exception):
+    #waze could not calculate a route - never cached on disk
+    pass
+
 
 class RouteCache:
     #adding cache to save wazeapi calls
-    def __init__(self, cache_file="route_cache.json"):
+    #stored as fixed width binary records: 16 byte blake2b of the key + duration + distance
+    RECORD = struct.Struct("<16sdd")
+    
+    def __init__(self, cache_file="route_cache.bin"):
         self.cache_file = cache_file
-        self.cache = self.load_cache()
+        #missing or without a single whole record - e.g. a first run after upgrading that was killed early
+        is_new = not os.path.exists(self.cache_file) or os.path.getsize(self.cache_file) < self.RECORD.size
+        self._mm = None
+        #key hash -> offset of its record in the mmap
+        self._index: Dict[bytes, int] = self.load_cache()
+        #in memory copy of hits and new entries - skip the hash and unpack on repeated lookups
+        self._memory: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        #new entries are appended to the file, flushed at the end of the run or on exit
+        self._fp = None
+        try:
+            self._fp = open(self.cache_file, 'ab')
+            #drop a half written last record so new entries stay aligned
+            size = self._fp.tell()
+            if size % self.RECORD.size:
+                self._fp.truncate(size - size % self.RECORD.size)
+        except Exception as e:
+            print(f"problem with cache - error {e}")
+        atexit.register(self.flush)
+        if is_new:
+            self.import_legacy_cache()
         
-    def load_cache(self) -> Dict:
+    def load_cache(self) -> Dict[bytes, int]:
+        index = {}
         if os.path.exists(self.cache_file):
             try:
-                with open(self.cache_file, 'r') as f:
-                    return json.load(f)
+                with open(self.cache_file, 'rb') as f:
+                    length = os.fstat(f.fileno()).st_size // self.RECORD.size * self.RECORD.size
+                    if length:
+                        self._mm = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+                #one pass over the keys - values are only unpacked when looked up
+                for offset in range(0, length, self.RECORD.size):
+                    #later records win on duplicate keys
+                    index[self._mm[offset:offset + 16]] = offset
             except Exception as e:
                 print(f"problem with cache - error {e}")
-        return {"routes": {}}
+        return index
     
-    def save_cache(self):
+    def import_legacy_cache(self):
+        #one time upgrade - older versions kept the cache as route_cache.json ({"routes": {key: [duration, distance]}})
+        #and then route_cache.jsonl (one {"k": key, "v": [duration, distance]} per line) next to this file
+        import json
+        base = os.path.splitext(self.cache_file)[0]
+        for legacy_file in (base + ".json", base + ".jsonl"):
+            if not os.path.exists(legacy_file):
+                continue
+            routes = {}
+            try:
+                with open(legacy_file, 'r') as f:
+                    if legacy_file.endswith(".jsonl"):
+                        for line in f:
+                            try:
+                                entry = json.loads(line)
+                            except ValueError:
+                                #skip blank or half written lines
+                                continue
+                            routes[entry["k"]] = entry["v"]
+                    else:
+                        routes = json.load(f)["routes"]
+            except Exception as e:
+                print(f"problem with cache - error {e}")
+                continue
+            imported = 0
+            for key, route_data in routes.items():
+                #(0, 0) was stored for failed api calls - leave those to be refetched
+                if not any(route_data):
+                    continue
+                source, _, destination = key.partition("|")
+                self.put((source, destination), tuple(route_data))
+                imported += 1
+            print(f"imported {imported} routes from old cache {legacy_file}")
+        #write the imported records now - not only at the end of the run
+        self.flush()
+    
+    def flush(self):
+        if self._fp is None:
+            return
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(self.cache, f, indent=2)
+            self._fp.flush()
         except Exception as e:
             print(f"problem with cache - error {e}")
     
-    def get_cache_key(self, source: str, destination: str) -> str:
-        return f"{source.lower()}|{destination.lower()}"
-        
+    @staticmethod
+    def get_cache_key(source: str, destination: str) -> Tuple[str, str]:
+        #normalize once per leg - the tuple is the key everywhere in memory
+        return (source.lower(), destination.lower())
     
-    def get_route(self, source: str, destination: str) -> Tuple[float, float]:
-        cache_key = self.get_cache_key(source, destination)
-        if cache_key in self.cache["routes"]:
-            print(f"get data from cache - {source} to {destination}")
-            return tuple(self.cache["routes"][cache_key])
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _record_key(cache_key: Tuple[str, str]) -> bytes:
+        #names are interned at parse time so the same pairs come back here over and over
+        return hashlib.blake2b("|".join(cache_key).encode(), digest_size=16).digest()
+    
+    def get(self, cache_key: Tuple[str, str]) -> Optional[Tuple[float, float]]:
+        route_data = self._memory.get(cache_key)
+        if route_data is not None:
+            return route_data
+        offset = self._index.get(self._record_key(cache_key))
+        if offset is not None:
+            logger.debug("get data from cache - %s to %s", *cache_key)
+            route_data = self.RECORD.unpack_from(self._mm, offset)[1:]
+            self._memory[cache_key] = route_data
+            return route_data
         return
     
+    def put(self, cache_key: Tuple[str, str], route_data: Tuple[float, float]):
+        self._memory[cache_key] = tuple(route_data)
+        if self._fp is not None:
+            try:
+                self._fp.write(self.RECORD.pack(self._record_key(cache_key), *route_data))
+            except Exception as e:
+                print(f"problem with cache - error {e}")
+    
+    def get_route(self, source: str, destination: str) -> Optional[Tuple[float, float]]:
+        return self.get(self.get_cache_key(source, destination))
+    
     def store_route(self, source: str, destination: str, route_data: Tuple[float, float]):
-        cache_key = self.get_cache_key(source, destination)
-        self.cache["routes"][cache_key] = route_data
-        self.save_cache()
+        self.put(self.get_cache_key(source, destination), route_data)
 
 
 class Segment:    
+    __slots__ = ("source", "destination", "duration_minutes", "distance_km", "stop_duration_minutes")
+    
     def __init__(self, source: str, destination: str, duration_minutes: float, 
                     distance_km: float, stop_duration_minutes: int = 0):
         self.source = source
@@ -65,20 +168,30 @@ class Segment:
 
 class Route:    
     #every route is array of 
+    __slots__ = ("source", "destination", "arrival_time", "segments", "_total_duration")
+    
     def __init__(self, source: str, destination: str, arrival_time: datetime.time):
         self.source = source
         self.destination = destination
         self.arrival_time = arrival_time
         self.segments: List[Segment] = []
+        #running total kept up to date by add_segment
+        self._total_duration = 0.0
     
     def add_segment(self, segment: Segment):
+        self._total_duration += segment.duration_minutes
         self.segments.append(segment)
     
+    def set_segment(self, index: int, segment: Segment):
+        #for a pre sized segments list - keeps the running total right if a slot is overwritten
+        previous = self.segments[index]
+        if previous is not None:
+            self._total_duration -= previous.duration_minutes
+        self._total_duration += segment.duration_minutes
+        self.segments[index] = segment
+    
     def get_total_duration(self) -> float:
-        total = 0.0
-        for segment in self.segments:
-            total += segment.duration_minutes 
-        return total
+        return self._total_duration
     
     def calculate_departure_times(self) -> Dict[str, datetime.time]:
         #main logic - start from arrival time and work backwards
@@ -87,79 +200,353 @@ class Route:
             return {}
         
         departure_times = {}
-        current_time = datetime.datetime.combine(datetime.date.today(), self.arrival_time)
+        #bind once - avoids the module attribute lookup every iteration
+        make_time = datetime.time
+        #plain seconds since midnight instead of datetime/timedelta objects
+        total = self.arrival_time.hour * 3600 + self.arrival_time.minute * 60 + self.arrival_time.second
         
         for segment in reversed(self.segments):
             # Set arrival time as destination
             # Subtract segment duration to get departure time from source, segment after segment
-            current_time = current_time - datetime.timedelta(minutes=segment.duration_minutes)
-            departure_times[segment.source] = current_time.time()
+            total -= segment.duration_minutes * 60
+            h, rem = divmod(int(total // 1) % 86400, 3600)
+            m, sec = divmod(rem, 60)
+            departure_times[segment.source] = make_time(h, m, sec)
             
             # Subtract stop duration for next calculation check if > 0
             if segment.stop_duration_minutes > 0:
-                current_time = current_time - datetime.timedelta(minutes=segment.stop_duration_minutes)
+                total -= segment.stop_duration_minutes * 60
         
         return departure_times
 
 
+#WazeRouteCalculator is imported on the first api call - fully cached runs never load the http stack
+_waze_calculator_cls = None
+_waze_version = None
+#one http session for the whole process so keep-alive connections and tls sessions are reused
+_waze_session = None
+_waze_load_lock = threading.Lock()
+#the session swap below relies on the library using nothing from requests but .get - checked against this version
+WAZE_SESSION_PATCH_VERSION = "0.16"
+#WazeAPI.get_route_async ports the library's request building - checked against this version only
+WAZE_ASYNC_PORT_VERSION = "0.16"
+
+
+def _load_waze_calculator():
+    global _waze_calculator_cls, _waze_session, _waze_version
+    if _waze_calculator_cls is not None:
+        return _waze_calculator_cls
+    with _waze_load_lock:
+        if _waze_calculator_cls is not None:
+            return _waze_calculator_cls
+        import requests
+        import WazeRouteCalculator as waze_package
+        from WazeRouteCalculator import WazeRouteCalculator
+        waze_module = sys.modules[WazeRouteCalculator.__module__]
+        _waze_version = getattr(waze_package, "__version__", None)
+        #WazeRouteCalculator==0.16 calls requests.get straight from its module and takes no session,
+        #so point that module's requests at one shared session. done once per process, only for that
+        #version and only if nobody replaced it already - otherwise the library keeps plain requests
+        if (_waze_version == WAZE_SESSION_PATCH_VERSION
+                and getattr(waze_module, "requests", None) is requests):
+            _waze_session = requests.Session()
+            waze_module.requests = _waze_session
+        _waze_calculator_cls = WazeRouteCalculator
+    return _waze_calculator_cls
+
+
+def waze_async_supported() -> bool:
+    #the async path is only used with the library version its port was checked against
+    _load_waze_calculator()
+    return _waze_version == WAZE_ASYNC_PORT_VERSION
+
+
 class WazeAPI:    
     def __init__(self, region='IL'):
         self.region = region
     
     def get_route(self, source: str, destination: str) -> Tuple[float, float]:
+        waze = _load_waze_calculator()
         try:
-            calculator = WazeRouteCalculator(source, destination, self.region)
+            calculator = waze(source, destination, self.region)
             return calculator.calc_route_info()
         except Exception as e:
-            print(f"error calculating route: {e}")
-            return (0, 0)
+            raise RouteError(f"error calculating route from {source} to {destination}: {e}") from e
+    
+    async def _address_to_coords_async(self, http, address: str) -> Dict[str, float]:
+        #same lookup as WazeRouteCalculator.address_to_coords, non blocking
+        from urllib.parse import urljoin
+        waze = _load_waze_calculator()
+        if re.search(waze.COORD_MATCH, address):
+            lat, lon = address.split(',')
+            return {"lat": lat.strip(), "lon": lon.strip()}
+        region = self._waze_region()
+        base_coords = waze.BASE_COORDS[region]
+        params = {
+            "q": address,
+            "lang": "eng",
+            "origin": "livemap",
+            "lat": str(base_coords["lat"]),
+            "lon": str(base_coords["lon"])
+        }
+        async with http.get(urljoin(waze.WAZE_URL, waze.COORD_SERVERS[region]), params=params, headers=waze.HEADERS) as response:
+            candidates = await response.json(content_type=None)
+        for candidate in candidates:
+            if candidate.get('city'):
+                return {"lat": candidate['location']['lat'], "lon": candidate['location']['lon']}
+        raise ValueError(f"cannot get coords for {address}")
+    
+    def _waze_region(self) -> str:
+        region = self.region.upper()
+        return 'US' if region == 'NA' else region
+    
+    async def get_route_async(self, http, source: str, destination: str) -> Tuple[float, float]:
+        #talks to the waze endpoints directly over an aiohttp session - the library itself only does blocking requests
+        #same defaults as calc_route_info: real time, single path, no toll/ferry avoidance
+        import asyncio
+        from urllib.parse import urljoin
+        waze = _load_waze_calculator()
+        try:
+            start, end = await asyncio.gather(self._address_to_coords_async(http, source),
+                                              self._address_to_coords_async(http, destination))
+            params = {
+                "from": f"x:{start['lon']} y:{start['lat']}",
+                "to": f"x:{end['lon']} y:{end['lat']}",
+                "at": "0",
+                "returnJSON": "true",
+                "returnGeometries": "true",
+                "returnInstructions": "true",
+                "timeout": "60000",
+                "nPaths": "1",
+                "options": "AVOID_TRAILS:t,AVOID_TOLL_ROADS:f,AVOID_FERRIES:f",
+                "subscription": "*"
+            }
+            #0.16 stores absolute routing urls, 0.15 and older paths relative to WAZE_URL - urljoin handles both
+            routing_url = urljoin(waze.WAZE_URL, waze.ROUTING_SERVERS[self._waze_region()])
+            async with http.get(routing_url, params=params, headers=waze.HEADERS) as response:
+                if response.status >= 400:
+                    raise ValueError(f"http {response.status}")
+                response_json = await response.json(content_type=None)
+            if not response_json:
+                raise ValueError("empty response")
+            if 'error' in response_json:
+                raise ValueError(response_json['error'])
+            if response_json.get("alternatives"):
+                route = response_json['alternatives'][0]['response']
+            else:
+                route = response_json['response']
+                if isinstance(route, list):
+                    route = route[0]
+            results = route['results' if 'results' in route else 'result']
+            seconds = sum(segment['crossTime'] if 'crossTime' in segment else segment['cross_time'] for segment in results)
+            meters = sum(segment['length'] for segment in results)
+            return seconds / 60.0, meters / 1000.0
+        except Exception as e:
+            raise RouteError(f"error calculating route from {source} to {destination}: {e}") from e
+
+
+def batch_departure_minutes(durations, stop_durations, arrivals_min):
+    #departure minute (mod a day) from the source of every segment, for many routes at once
+    #durations / stop_durations are (routes x segments), arrivals_min is one value per route
+    #same rule as Route.calculate_departure_times: a segment's stop only delays the segments before it
+    try:
+        #optional and imported here so single route runs never pay for it
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is not None:
+        durations = np.asarray(durations, dtype=float)
+        stop_durations = np.asarray(stop_durations, dtype=float)
+        arrivals_min = np.asarray(arrivals_min, dtype=float)
+        cum = np.cumsum((durations + stop_durations)[:, ::-1], axis=1)[:, ::-1] - stop_durations
+        return ((arrivals_min[:, None] - cum) % 1440).tolist()
+    
+    results = []
+    for route_durations, route_stops, arrival in zip(durations, stop_durations, arrivals_min):
+        row = [0.0] * len(route_durations)
+        total = arrival
+        for i in range(len(route_durations) - 1, -1, -1):
+            total -= route_durations[i]
+            row[i] = total % 1440
+            total -= route_stops[i]
+        results.append(row)
+    return results
 
 
 class WazeRouteCacheCalculator:
-    def __init__(self, cache_file, region):
+    #how long a failed leg is remembered before we ask waze again
+    FAILURE_TTL_SECONDS = 60
+    #with use_async, fan outs at least this wide go through asyncio + aiohttp instead of the thread pool
+    #(only when no event loop is already running in this thread - otherwise the thread pool is used)
+    ASYNC_MIN_LEGS = 4
+    
+    def __init__(self, cache_file, region, use_async=False):
         self.cache = RouteCache(cache_file)
         self.api = WazeAPI(region)
+        self.use_async = use_async
+        #in memory only - failed legs with the time they failed
+        self._failures: Dict[Tuple[str, str], Tuple[float, RouteError]] = {}
+    
+    def _check_failure(self, cache_key: Tuple[str, str]):
+        #negative caching - a leg that just failed is not retried until the ttl runs out
+        failure = self._failures.get(cache_key)
+        if failure is not None:
+            failed_at, error = failure
+            if time.monotonic() - failed_at < self.FAILURE_TTL_SECONDS:
+                raise error
+            del self._failures[cache_key]
+    
+    def _fetch_route(self, source: str, destination: str, cache_key: Tuple[str, str]) -> Tuple[float, float]:
+        self._check_failure(cache_key)
+        try:
+            return self.api.get_route(source, destination)
+        except RouteError as e:
+            self._failures[cache_key] = (time.monotonic(), e)
+            raise
+    
+    async def _fetch_route_async(self, http, source: str, destination: str,
+                                 cache_key: Tuple[str, str]) -> Tuple[float, float]:
+        self._check_failure(cache_key)
+        try:
+            return await self.api.get_route_async(http, source, destination)
+        except RouteError as e:
+            self._failures[cache_key] = (time.monotonic(), e)
+            raise
+    
+    async def _fetch_all_async(self, fetches: List[Tuple[str, str, Tuple[str, str]]]) -> list:
+        #one event loop and one aiohttp session for the whole fan out - results or exceptions, in order
+        import asyncio
+        import aiohttp
+        async with aiohttp.ClientSession() as http:
+            return await asyncio.gather(*(self._fetch_route_async(http, *fetch) for fetch in fetches),
+                                        return_exceptions=True)
     
     def calculate_route_segment(self, source: str, destination: str) -> Tuple[float, float]:
-        #cache first policy 
-        route_data = self.cache.get_route(source, destination)
+        #cache first policy - RouteCache._memory already keeps every hit in memory, no extra lru on top
+        cache_key = self.cache.get_cache_key(source, destination)
+        route_data = self.cache.get(cache_key)
         
         if route_data is None:
-            route_data = self.api.get_route(source, destination)
-            self.cache.store_route(source, destination, route_data)
+            #waze gets the user's spelling, the lowercased pair is only the key
+            #only successful results reach the cache
+            route_data = self._fetch_route(source, destination, cache_key)
+            self.cache.put(cache_key, route_data)
         
         return route_data
     
-    def build_route(self, source: str, destination: str, 
-                   stops: List[Tuple[str, int]], arrival_time: datetime.time) -> Route:
-        route = Route(source, destination, arrival_time)     
-        # Start with source
-        current_location = source
-        for next_location, stop_duration in stops:
-            duration, distance = self.calculate_route_segment(current_location, next_location)
-            #iterate over stops and add segment
+    def _use_async_for(self, missing_count: int) -> bool:
+        if not self.use_async or missing_count < self.ASYNC_MIN_LEGS:
+            return False
+        #imported here - asyncio alone is tens of ms of start up the default path never needs
+        import asyncio
+        #asyncio.run cannot nest - when called from inside a running event loop use the thread pool instead
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            #get_route_async copies the library's request building - other versions stay on the thread pool
+            return waze_async_supported()
+        return False
+    
+    def _resolve_legs(self, legs: List[Tuple[str, str]]) -> List[Tuple[float, float]]:
+        #each distinct leg is resolved once - repeats (also across itineraries in a batch) share the result
+        keys = [self.cache.get_cache_key(src, dst) for src, dst in legs]
+        unique_legs: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        for cache_key, leg in zip(keys, legs):
+            unique_legs.setdefault(cache_key, leg)
+        
+        #cache first, then fetch all missing legs concurrently
+        resolved = {cache_key: self.cache.get(cache_key) for cache_key in unique_legs}
+        missing = [cache_key for cache_key, route_data in resolved.items() if route_data is None]
+        if missing:
+            if self._use_async_for(len(missing)):
+                import asyncio
+                outcomes = asyncio.run(self._fetch_all_async([(*unique_legs[k], k) for k in missing]))
+            else:
+                with ThreadPoolExecutor(max_workers=min(8, len(missing))) as executor:
+                    futures = [executor.submit(self._fetch_route, *unique_legs[k], k) for k in missing]
+                outcomes = [future.exception() or future.result() for future in futures]
+            #store every leg that did resolve before reporting a failure
+            error = None
+            for cache_key, outcome in zip(missing, outcomes):
+                if isinstance(outcome, BaseException):
+                    if not isinstance(outcome, RouteError):
+                        raise outcome
+                    error = error or outcome
+                    continue
+                resolved[cache_key] = outcome
+                self.cache.put(cache_key, outcome)
+            if error is not None:
+                raise error
+        return [resolved[cache_key] for cache_key in keys]
+    
+    @staticmethod
+    def _itinerary_legs(source: str, destination: str, stops: List[Tuple[str, int]]) -> List[Tuple[str, str]]:
+        #all legs up front: source -> stops -> destination
+        locations = [source] + [location for location, _ in stops] + [destination]
+        return list(zip(locations[:-1], locations[1:]))
+    
+    @staticmethod
+    def _assemble_route(source: str, destination: str, stops: List[Tuple[str, int]],
+                        arrival_time: datetime.time, legs: List[Tuple[str, str]],
+                        resolved: List[Tuple[float, float]]) -> Route:
+        route = Route(source, destination, arrival_time)
+        #leg count is known up front - allocate the list once and fill by index
+        route.segments = [None] * len(legs)
+        stop_durations = [stop_duration for _, stop_duration in stops] + [0]
+        for i, ((src, dst), (duration, distance), stop_duration) in enumerate(zip(legs, resolved, stop_durations)):
             segment = Segment(
-                source=current_location,
-                destination=next_location,
+                source=src,
+                destination=dst,
                 duration_minutes=duration,
                 distance_km=distance,
                 stop_duration_minutes=stop_duration
             )
-            route.add_segment(segment)
-            current_location = next_location
+            route.set_segment(i, segment)
+        return route
+    
+    def build_route(self, source: str, destination: str, 
+                   stops: List[Tuple[str, int]], arrival_time: datetime.time) -> Route:
+        legs = self._itinerary_legs(source, destination, stops)
+        resolved = self._resolve_legs(legs)
+        return self._assemble_route(source, destination, stops, arrival_time, legs, resolved)
+    
+    def build_routes_batch(self, itineraries: List[Tuple[str, str, List[Tuple[str, int]], datetime.time]]
+                           ) -> List[Tuple[Route, Dict[str, datetime.time]]]:
+        #many (source, destination, stops, arrival_time) at once - one cache/api pass for every leg,
+        #then all departure times in one shot
+        if not itineraries:
+            return []
+        itinerary_legs = [self._itinerary_legs(src, dst, stops) for src, dst, stops, _ in itineraries]
+        resolved = self._resolve_legs([leg for legs in itinerary_legs for leg in legs])
         
-        # Add final segment to destination
-        duration, distance = self.calculate_route_segment(current_location, destination)
-        final_segment = Segment(
-            source=current_location,
-            destination=destination,
-            duration_minutes=duration,
-            distance_km=distance,
-            stop_duration_minutes=0
-        )
-        route.add_segment(final_segment)
+        routes = []
+        offset = 0
+        for (src, dst, stops, arrival_time), legs in zip(itineraries, itinerary_legs):
+            routes.append(self._assemble_route(src, dst, stops, arrival_time, legs,
+                                               resolved[offset:offset + len(legs)]))
+            offset += len(legs)
         
-        return route
+        #pad to a rectangle - trailing zero legs do not change the sums from the right
+        width = max(len(route.segments) for route in routes)
+        durations = [[segment.duration_minutes for segment in route.segments] + [0.0] * (width - len(route.segments))
+                     for route in routes]
+        stop_durations = [[segment.stop_duration_minutes for segment in route.segments] + [0] * (width - len(route.segments))
+                          for route in routes]
+        arrivals = [route.arrival_time.hour * 60 + route.arrival_time.minute + route.arrival_time.second / 60
+                    for route in routes]
+        departures = batch_departure_minutes(durations, stop_durations, arrivals)
+        
+        make_time = datetime.time
+        results = []
+        for route, row in zip(routes, departures):
+            departure_times = {}
+            #last leg first, like calculate_departure_times - a place visited twice keeps its earliest departure
+            for segment, minutes in reversed(list(zip(route.segments, row))):
+                h, rem = divmod(int((minutes * 60) // 1) % 86400, 3600)
+                m, sec = divmod(rem, 60)
+                departure_times[segment.source] = make_time(h, m, sec)
+            results.append((route, departure_times))
+        return results
     
     def get_departure_time(self, source: str, destination: str, 
                          stops: List[Tuple[str, int]], arrival_time: datetime.time) -> datetime.time:
@@ -169,6 +556,46 @@ class WazeRouteCacheCalculator:
 
 
 class InputParser:
+    #fixed cli schema - hand rolled instead of argparse to keep start up cheap
+    USAGE = "usage: main.py --src SRC --dst DST [--stops STOPS] --arrival_time HH:MM"
+    OPTIONS = ("src", "dst", "stops", "arrival_time")
+    REQUIRED = ("src", "dst", "arrival_time")
+    
+    @staticmethod
+    def _usage_error(message: str):
+        #same exit code and stream as argparse
+        print(f"{InputParser.USAGE}\nerror: {message}", file=sys.stderr)
+        raise SystemExit(2)
+    
+    @staticmethod
+    def parse_args(argv: List[str]) -> Dict[str, str]:
+        opts = {}
+        i = 0
+        while i < len(argv):
+            arg = argv[i]
+            if arg in ("-h", "--help"):
+                print(InputParser.USAGE)
+                raise SystemExit(0)
+            if not arg.startswith("--"):
+                InputParser._usage_error(f"unexpected argument: {arg}")
+            # Accept both "--key value" and "--key=value"
+            key, sep, value = arg[2:].partition("=")
+            if not sep:
+                if i + 1 >= len(argv):
+                    InputParser._usage_error(f"--{key} expects a value")
+                i += 1
+                value = argv[i]
+            if key not in InputParser.OPTIONS:
+                InputParser._usage_error(f"unknown option: --{key}")
+            opts[key] = value
+            i += 1
+        
+        missing = [f"--{key}" for key in InputParser.REQUIRED if key not in opts]
+        if missing:
+            InputParser._usage_error(f"missing required arguments: {', '.join(missing)}")
+        return opts
+    
+    @staticmethod
     def parse_stops(stops_str: str) -> List[Tuple[str, int]]:
         if not stops_str:
             return []
@@ -178,14 +605,12 @@ class InputParser:
             raise ValueError("stops must be in pairs of location,duration")
         
         stops = []
-        for i in range(0, len(parts), 2):
-            location = parts[i]
-            duration_str = parts[i+1]
-            
+        for location, duration_str in zip(parts[0::2], parts[1::2]):
             # Parse duration like "1h" or "15m"
-            if duration_str.endswith('h'):
+            unit = duration_str[-1:]
+            if unit == 'h':
                 duration = int(duration_str[:-1]) * 60
-            elif duration_str.endswith('m'):
+            elif unit == 'm':
                 duration = int(duration_str[:-1])
             else:
                 try:
@@ -193,10 +618,11 @@ class InputParser:
                 except ValueError:
                     raise ValueError(f"invalid duration format: {duration_str}")
             
-            stops.append((location, duration))
+            stops.append((sys.intern(location.strip()), duration))
         
         return stops
     
+    @staticmethod
     def parse_time(time_str: str) -> datetime.time:
         try:
             return datetime.datetime.strptime(time_str, "%H:%M").time()
@@ -206,22 +632,24 @@ class InputParser:
 
 def main():
     #read the args and orchestrate route
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--src", required=True)
-    parser.add_argument("--dst", required=True)
-    parser.add_argument("--stops")
-    parser.add_argument("--arrival_time", required=True)
-    
-    args = parser.parse_args()
+    args = InputParser.parse_args(sys.argv[1:])
     
-    stops = InputParser.parse_stops(args.stops) if args.stops else []
-    arrival_time = InputParser.parse_time(args.arrival_time)
+    src = sys.intern(args["src"])
+    dst = sys.intern(args["dst"])
+    stops = InputParser.parse_stops(args["stops"]) if args.get("stops") else []
+    arrival_time = InputParser.parse_time(args["arrival_time"])
     
-    calculator = WazeRouteCacheCalculator(cache_file="route_cache.json", region='IL')
-    departure_time = calculator.get_departure_time(args.src, args.dst, stops, arrival_time)
+    calculator = WazeRouteCacheCalculator(cache_file="route_cache.bin", region='IL')
+    try:
+        departure_time = calculator.get_departure_time(src, dst, stops, arrival_time)
+    except RouteError as e:
+        print(e)
+        return 1
+    finally:
+        calculator.cache.flush()
     
     #print result
-    print(f"output: leave {args.src} at {departure_time.strftime('%H:%M')} to reach {args.dst} by {args.arrival_time}")
+    print(f"output: leave {src} at {departure_time.strftime('%H:%M')} to reach {dst} by {args['arrival_time']}")
     
     return 0
 
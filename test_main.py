@@ -0,0 +1,154 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+import main
+
+
+class BatchDepartureTimesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.calculator = main.WazeRouteCacheCalculator(os.path.join(self.tmp.name, "route_cache.bin"), 'IL')
+        durations = {("haifa", "tlv"): 90.5, ("tlv", "haifa"): 95.0, ("tlv", "eilat"): 276.25}
+        #no network - fixed durations per leg
+        self.calculator.api.get_route = lambda src, dst: (durations[(src.lower(), dst.lower())], 1.0)
+    
+    def tearDown(self):
+        self.calculator.cache.flush()
+        self.tmp.cleanup()
+    
+    def test_batch_matches_single_route_with_repeated_stops(self):
+        stops = [("TLV", 30), ("Haifa", 15), ("TLV", 10)]
+        arrival_time = datetime.time(12, 0)
+        expected = self.calculator.build_route("Haifa", "Eilat", stops, arrival_time).calculate_departure_times()
+        
+        [(route, departure_times)] = self.calculator.build_routes_batch([("Haifa", "Eilat", stops, arrival_time)])
+        
+        self.assertEqual(departure_times, expected)
+        self.assertEqual(departure_times["Haifa"], route.calculate_departure_times()["Haifa"])
+
+
+class AsyncFallbackTest(unittest.TestCase):
+    def test_running_event_loop_uses_thread_pool(self):
+        import asyncio
+        with tempfile.TemporaryDirectory() as tmp:
+            calculator = main.WazeRouteCacheCalculator(os.path.join(tmp, "route_cache.bin"), 'IL', use_async=True)
+            calculator.api.get_route = lambda src, dst: (10.0, 1.0)
+            stops = [("B", 0), ("C", 0), ("D", 0)]
+            
+            async def build():
+                return calculator.build_route("A", "E", stops, datetime.time(9, 0))
+            
+            route = asyncio.run(build())
+            calculator.cache.flush()
+        
+        self.assertEqual(route.get_total_duration(), 40.0)
+    
+    def test_unchecked_library_version_uses_thread_pool(self):
+        saved = main._waze_calculator_cls, main._waze_version
+        main._waze_calculator_cls, main._waze_version = _FakeWaze, "0.15"
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                calculator = main.WazeRouteCacheCalculator(os.path.join(tmp, "route_cache.bin"), 'IL', use_async=True)
+                calculator.api.get_route = lambda src, dst: (10.0, 1.0)
+                route = calculator.build_route("A", "E", [("B", 0), ("C", 0), ("D", 0)], datetime.time(9, 0))
+                calculator.cache.flush()
+        finally:
+            main._waze_calculator_cls, main._waze_version = saved
+        
+        self.assertEqual(route.get_total_duration(), 40.0)
+
+
+class LegacyCacheImportTest(unittest.TestCase):
+    def test_json_cache_is_imported_into_new_binary_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "route_cache.json"), 'w') as f:
+                f.write('{"routes": {"tel aviv|haifa": [55.5, 90.0], "a|b": [0, 0]}}')
+            cache = main.RouteCache(os.path.join(tmp, "route_cache.bin"))
+            cache.flush()
+            
+            reloaded = main.RouteCache(os.path.join(tmp, "route_cache.bin"))
+            reloaded.flush()
+            
+            self.assertEqual(reloaded.get_route("Tel Aviv", "Haifa"), (55.5, 90.0))
+            self.assertIsNone(reloaded.get_route("a", "b"))
+    
+    def test_import_is_written_before_flush_and_retried_over_empty_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "route_cache.json"), 'w') as f:
+                f.write('{"routes": {"tel aviv|haifa": [55.5, 90.0]}}')
+            #left behind by a first run that was killed before writing anything
+            open(os.path.join(tmp, "route_cache.bin"), 'wb').close()
+            main.RouteCache(os.path.join(tmp, "route_cache.bin"))
+            
+            #no flush on the first cache - the import must already be on disk
+            reloaded = main.RouteCache(os.path.join(tmp, "route_cache.bin"))
+            reloaded.flush()
+            
+            self.assertEqual(reloaded.get_route("Tel Aviv", "Haifa"), (55.5, 90.0))
+
+
+class _FakeResponse:
+    def __init__(self, url):
+        self.url = url
+        self.status = 200
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+    
+    async def json(self, content_type=None):
+        if "SearchServer" in self.url:
+            return [{"city": "x", "location": {"lat": 32.0, "lon": 34.8}}]
+        return {"response": {"results": [{"crossTime": 600, "length": 5000}, {"crossTime": 300, "length": 2500}]}}
+
+
+class _FakeHttp:
+    def __init__(self):
+        self.urls = []
+    
+    def get(self, url, params=None, headers=None):
+        self.urls.append(url)
+        return _FakeResponse(url)
+
+
+class _FakeWaze:
+    #constants shaped like WazeRouteCalculator, routing servers overridden per test
+    WAZE_URL = "https://www.waze.com/"
+    HEADERS = {"User-Agent": "Mozilla/5.0"}
+    BASE_COORDS = {"IL": {"lat": 31.768, "lon": 35.214}}
+    COORD_SERVERS = {"IL": "il-SearchServer/mozi"}
+    COORD_MATCH = r"^\d+\.\d+,\s*\d+\.\d+$"
+
+
+class GetRouteAsyncTest(unittest.TestCase):
+    def setUp(self):
+        self._saved = main._waze_calculator_cls
+    
+    def tearDown(self):
+        main._waze_calculator_cls = self._saved
+    
+    def _fetch(self, routing_server):
+        import asyncio
+        main._waze_calculator_cls = type("Waze", (_FakeWaze,), {"ROUTING_SERVERS": {"IL": routing_server}})
+        http = _FakeHttp()
+        route_data = asyncio.run(main.WazeAPI('IL').get_route_async(http, "Tel Aviv", "Haifa"))
+        return route_data, http.urls
+    
+    def test_absolute_routing_url(self):
+        route_data, urls = self._fetch("https://routing-livemap-il.waze.com/RoutingManager/routingRequest")
+        self.assertEqual(route_data, (15.0, 7.5))
+        self.assertEqual(urls[-1], "https://routing-livemap-il.waze.com/RoutingManager/routingRequest")
+        self.assertEqual(urls[0], "https://www.waze.com/il-SearchServer/mozi")
+    
+    def test_relative_routing_url(self):
+        route_data, urls = self._fetch("il-RoutingManager/routingRequest")
+        self.assertEqual(route_data, (15.0, 7.5))
+        self.assertEqual(urls[-1], "https://www.waze.com/il-RoutingManager/routingRequest")
+
+
+if __name__ == "__main__":
+    unittest.main()